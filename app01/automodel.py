@@ -14,6 +14,8 @@ class UserConfig(automodel.AutomodelConfig):
 
     show_actions_form = True
 
+    autocomplete_fields = ["dep", "role"]
+
     def extra_url(self):
         from django.urls import path
         urls = [
@@ -26,8 +28,16 @@ class UserConfig(automodel.AutomodelConfig):
         return HttpResponse("自定义额外的url")
 
 
-automodel.site.register(models.Role)
-automodel.site.register(models.Department)
+class RoleConfig(automodel.AutomodelConfig):
+    search_fields = ["title"]
+
+
+class DepartmentConfig(automodel.AutomodelConfig):
+    search_fields = ["caption"]
+
+
+automodel.site.register(models.Role, RoleConfig)
+automodel.site.register(models.Department, DepartmentConfig)
 automodel.site.register(models.User, UserConfig)
 automodel.site.register(models.Host)
 
@@ -0,0 +1,24 @@
+# Generated by Django 2.2.28 on 2026-10-19 10:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app01', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='host',
+            name='dep',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='app01.Department', verbose_name='所属部门'),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='dep',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='app01.Department', verbose_name='所属部门'),
+        ),
+    ]
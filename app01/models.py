@@ -24,7 +24,7 @@ class User(models.Model):
     email = models.EmailField(verbose_name="邮箱")
 
     role = models.ManyToManyField(to=Role, verbose_name="用户角色")
-    dep = models.ForeignKey(to=Department, verbose_name="所属部门", on_delete=False)
+    dep = models.ForeignKey(to=Department, verbose_name="所属部门", on_delete=models.PROTECT)
 
     def __str__(self):
         return self.username
@@ -33,7 +33,7 @@ class User(models.Model):
 class Host(models.Model):
     """主机表"""
     ip = models.GenericIPAddressField(verbose_name="主机ip", protocol='both')
-    dep = models.ForeignKey(to=Department, on_delete=False, verbose_name="所属部门", blank=True, null=True)
+    dep = models.ForeignKey(to=Department, on_delete=models.SET_NULL, verbose_name="所属部门", blank=True, null=True)
 
     def __str__(self):
         return self.ip
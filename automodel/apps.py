@@ -6,4 +6,5 @@ class AutomodelConfig(AppConfig):
     name = 'automodel'
 
     def ready(self):
+        from automodel import checks  # noqa: F401 注册系统检查
         autodiscover_modules("automodel")
@@ -0,0 +1,39 @@
+from django.core.checks import Warning, register
+
+from automodel.services.version import cache_is_shared
+
+
+def get_version_options(config):
+    """config开启的、依赖cache中数据版本号的配置"""
+    result = []
+    if config.get_conditional_get():
+        result.append("conditional_get")
+    if config.get_list_aggregates():
+        result.append("list_aggregates")
+    if config.get_list_cache():
+        result.append("list_cache")
+    if config.get_coalesce_requests() and config.coalesce_across_processes:
+        result.append("coalesce_across_processes")
+    return result
+
+
+@register()
+def check_shared_cache(app_configs, **kwargs):
+    """依赖数据版本号的配置需要多进程共用的cache"""
+    from automodel.services import automodel
+
+    if cache_is_shared():
+        return []
+    errors = []
+    for model_class, config in automodel.site._registry.items():
+        options = get_version_options(config)
+        if options:
+            errors.append(Warning(
+                "%s.%s开启了%s，但默认cache为进程内cache" % (config.app_name, config.model_name, "、".join(options)),
+                hint="数据版本号保存在cache中，其他进程写入后本进程的版本号不会变化，"
+                     "会返回过期的304、汇总、总条数和列表数据，跨进程合并请求也不生效。"
+                     "请配置多进程共用的cache(如memcached、redis)。",
+                obj=config.__class__,
+                id="automodel.W001",
+            ))
+    return errors
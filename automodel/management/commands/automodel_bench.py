@@ -0,0 +1,59 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+
+from automodel.services import automodel
+from automodel.services.automodel import ShowList
+
+
+class Command(BaseCommand):
+    """
+    对比列表页面两种表格渲染方式的速度（行/秒）
+
+    用法：
+        python manage.py automodel_bench --rows 500 --repeat 5
+        python manage.py automodel_bench app01.user
+    """
+    help = "比较show_list模板循环与快速渲染的表格渲染速度"
+
+    def add_arguments(self, parser):
+        parser.add_argument("models", nargs="*", help="app_label.model_name，默认全部已注册的model")
+        parser.add_argument("--rows", type=int, default=500, help="每页行数")
+        parser.add_argument("--repeat", type=int, default=5, help="每种方式渲染的次数")
+
+    def handle(self, *args, **options):
+        rows, repeat = options["rows"], options["repeat"]
+        factory = RequestFactory()
+
+        for model_class, config in automodel.site._registry.items():
+            label = "%s.%s" % config.app_model_name
+            if options["models"] and label not in options["models"]:
+                continue
+
+            # 取一条数据重复填满一页，不对数据库做任何写入
+            sample = list(model_class.objects.all()[:1])
+            if not sample:
+                self.stdout.write("%s: 没有数据，跳过" % label)
+                continue
+            data_list = sample * rows
+
+            config.request = factory.get(config.get_list_url())
+            config.list_per_page = rows
+            try:
+                result = {}
+                for fast_render in (False, True):
+                    config.fast_render = fast_render
+                    start = time.perf_counter()
+                    for _ in range(repeat):
+                        content = ShowList(config, data_list)
+                        render_to_string("automodel/show_list.html", {"content": content}, config.request)
+                    result[fast_render] = rows * repeat / (time.perf_counter() - start)
+            finally:
+                del config.list_per_page
+                del config.fast_render
+                config.request = None
+
+            self.stdout.write("%s: 模板循环 %.0f 行/秒, 快速渲染 %.0f 行/秒, 提升 %.1fx" % (
+                label, result[False], result[True], result[True] / result[False]))
@@ -0,0 +1,101 @@
+import os
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, migrations
+from django.db.migrations.autodetector import MigrationAutodetector
+from django.db.migrations.loader import MigrationLoader
+from django.db.migrations.questioner import NonInteractiveMigrationQuestioner
+from django.db.migrations.state import ProjectState
+from django.db.migrations.writer import MigrationWriter
+
+from automodel.services import automodel
+from automodel.services.index_advisor import IndexAdvisor
+
+
+class Command(BaseCommand):
+    """
+    对已注册model的列表页面和输入联想实际执行的查询执行EXPLAIN，为其中全表扫描的条件、排序字段建议索引
+
+    建议的索引需先添加到model的Meta.indexes中，再由本命令按models与已有migration的差异生成migration，
+    与makemigrations的结果一致：已生成但未执行的migration不会重复生成，之后makemigrations也不会删除这些索引。
+    Meta.indexes中缺少建议的索引，或这些app还有索引以外未生成migration的修改时，不生成migration并报错。
+
+    用法：
+        python manage.py automodel_indexes --dry-run
+        python manage.py automodel_indexes app01.user
+    """
+    help = "根据列表页面查询的执行计划建议索引，并为Meta.indexes中已添加的索引生成migration"
+
+    def add_arguments(self, parser):
+        parser.add_argument("models", nargs="*", help="app_label.model_name，默认全部已注册的model")
+        parser.add_argument("--dry-run", action="store_true", help="只输出报告，不生成migration")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("仅支持sqlite数据库")
+
+        app_labels = set()
+        # Meta.indexes中还没有的建议索引
+        missing = []
+        for model_class, config in automodel.site._registry.items():
+            label = "%s.%s" % config.app_model_name
+            if options["models"] and label not in options["models"]:
+                continue
+
+            advisor = IndexAdvisor(config)
+            self.stdout.write(label)
+            for desc, plan, conclusion in advisor.check():
+                self.stdout.write("  %s: %s\n    %s" % (desc, conclusion, "\n    ".join(plan)))
+            if not advisor.suggested_indexes:
+                continue
+
+            app_labels.add(config.app_name)
+            declared = [list(index.fields) for index in model_class._meta.indexes]
+            indexes = [index for index in advisor.suggested_indexes if list(index.fields) not in declared]
+            if indexes:
+                missing.append(label)
+                self.stdout.write("  请在%s的Meta中添加：\n    indexes = [\n%s    ]" % (model_class.__name__, "".join(
+                    "        models.Index(fields=%r, name=%r),\n" % (index.fields, index.name)
+                    for index in indexes)))
+
+        if not app_labels:
+            self.stdout.write("没有需要添加的索引")
+            return
+        if options["dry_run"]:
+            return
+        if missing:
+            raise CommandError("%s的Meta.indexes中缺少建议的索引，请添加后再运行" % "、".join(missing))
+
+        changes = self.get_changes(app_labels)
+        if not changes:
+            self.stdout.write("索引的migration已存在，请执行migrate")
+            return
+        for app_label, app_migrations in changes.items():
+            for migration in app_migrations:
+                writer = MigrationWriter(migration)
+                with open(writer.path, "w", encoding="utf-8") as f:
+                    f.write(writer.as_string())
+                self.stdout.write("已生成 %s" % os.path.relpath(writer.path))
+
+    @staticmethod
+    def get_changes(app_labels):
+        """
+        models与已有migration(包括未执行的)的差异，只能包含添加索引
+        :return: {app_label: [Migration, ...]}
+        """
+        loader = MigrationLoader(None, ignore_no_migrations=True)
+        autodetector = MigrationAutodetector(
+            loader.project_state(), ProjectState.from_apps(apps),
+            NonInteractiveMigrationQuestioner(specified_apps=app_labels),
+        )
+        changes = autodetector.changes(graph=loader.graph, trim_to_apps=app_labels, convert_apps=app_labels,
+                                       migration_name="automodel_indexes")
+        for app_label, app_migrations in changes.items():
+            for migration in app_migrations:
+                others = [operation for operation in migration.operations
+                          if not isinstance(operation, migrations.AddIndex)]
+                if others:
+                    raise CommandError("%s还有索引以外的修改未生成migration：%s，请使用makemigrations" % (
+                        app_label, "；".join(operation.describe() for operation in others)))
+        return changes
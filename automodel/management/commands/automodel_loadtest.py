@@ -0,0 +1,264 @@
+import http.client
+import os
+import random
+import re
+import shutil
+import tempfile
+import threading
+import time
+from urllib.parse import urlencode
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler, get_internal_wsgi_application
+from django.db import connections
+
+from automodel.services import automodel
+
+
+class QuietHandler(WSGIRequestHandler):
+    """不输出访问日志"""
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Stats:
+    """各接口的请求结果"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # {接口: [耗时, ...]}
+        self.latency = {}
+        # {接口: 出错次数}
+        self.errors = {}
+
+    def add(self, endpoint, seconds, ok):
+        with self.lock:
+            self.latency.setdefault(endpoint, []).append(seconds)
+            self.errors.setdefault(endpoint, 0)
+            if not ok:
+                self.errors[endpoint] += 1
+
+    @staticmethod
+    def percentile(values, p):
+        return values[int(p * (len(values) - 1))]
+
+
+class LoadClient:
+    """
+    模拟一个用户，按比例随机请求列表、搜索、翻页、增加、修改、删除
+
+    每个接口返回是否成功：列表、搜索、翻页状态码小于400即成功；
+    增加、修改、删除成功后重定向到列表页面，只有302才算成功，重新显示表单的200或"数据不存在！"都是失败。
+
+    修改、删除的目标从已请求过的列表页面的勾选框中取得，不在客户端线程中查询数据库，
+    计时只包含服务端的处理。
+    """
+
+    pk_pattern = re.compile(r'<input type="checkbox" name="pk" value="(\d+)">')
+
+    def __init__(self, host, port, config, form_data, term):
+        """
+        :param config: 被测试model的AutomodelConfig对象
+        :param form_data: 增加、修改时提交的数据
+        :param term: 搜索关键字
+        """
+        self.host = host
+        self.port = port
+        self.config = config
+        self.form_data = form_data
+        self.term = term
+        self.csrf_token = ""
+        # 最近一次列表页面中的主键
+        self.pk_list = []
+
+    def request(self, method, url, data=None):
+        """发送请求，返回状态码"""
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+        headers = {}
+        body = None
+        if self.csrf_token:
+            headers["Cookie"] = "csrftoken=%s" % self.csrf_token
+        if method == "POST":
+            body = urlencode(data or {}, doseq=True)
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+            headers["X-CSRFToken"] = self.csrf_token
+        try:
+            conn.request(method, url, body=body, headers=headers)
+            response = conn.getresponse()
+            content = response.read()
+            if method == "GET":
+                pk_list = self.pk_pattern.findall(content.decode("utf-8", "ignore"))
+                if pk_list:
+                    self.pk_list = pk_list
+            for header, value in response.getheaders():
+                if header.lower() == "set-cookie" and value.startswith("csrftoken="):
+                    self.csrf_token = value.split(";", 1)[0].split("=", 1)[1]
+            return response.status
+        finally:
+            conn.close()
+
+    def list(self):
+        return self.request("GET", self.config.get_list_url()) < 400
+
+    def search(self):
+        return self.request("GET", "%s?%s" % (self.config.get_list_url(), urlencode({self.config.search_key: self.term}))) < 400
+
+    def page(self):
+        return self.request("GET", "%s?page=%s" % (self.config.get_list_url(), random.randint(1, 5))) < 400
+
+    def add(self):
+        return self.request("POST", self.config.get_add_url(), self.form_data) == 302
+
+    def change(self, pk):
+        return self.request("POST", "%s?_listfilter=" % self.config.get_change_url(pk), self.form_data) == 302
+
+    def delete(self, pk):
+        url = "%s?_listfilter=" % self.config.get_delete_url(pk)
+        if self.config.get_delete_preview():
+            return self.request("POST", url, {"_confirm": 1}) == 302
+        return self.request("GET", url) == 302
+
+    def get_pk(self, endpoint):
+        """在计时之前取得修改、删除的目标，没有已知的数据时先请求列表页面"""
+        if not self.pk_list:
+            self.list()
+        if not self.pk_list:
+            return None
+        if endpoint == "delete":
+            return self.pk_list.pop(random.randrange(len(self.pk_list)))
+        return random.choice(self.pk_list)
+
+    def run(self, mix, deadline, stats):
+        # 先访问列表页面获取csrf token和主键
+        self.list()
+        endpoints = list(mix)
+        weights = [mix[endpoint] for endpoint in endpoints]
+        while time.monotonic() < deadline:
+            endpoint = random.choices(endpoints, weights)[0]
+            args = ()
+            if endpoint in ("change", "delete"):
+                pk = self.get_pk(endpoint)
+                if pk is None:
+                    # 没有数据可以修改、删除
+                    endpoint = "list"
+                else:
+                    args = (pk, )
+            start = time.perf_counter()
+            try:
+                ok = getattr(self, endpoint)(*args)
+            except Exception:
+                ok = False
+            stats.add(endpoint, time.perf_counter() - start, ok)
+
+
+class Command(BaseCommand):
+    """
+    并发压力测试
+
+    在本进程启动WSGI应用，多个线程模拟用户按比例请求列表、搜索、翻页、增加、修改、删除，
+    输出各接口的吞吐量、延时分位数和错误率。
+
+    默认在sqlite数据库的临时副本上运行，不修改原数据库。
+
+    用法：
+        python manage.py automodel_loadtest app01.user --clients 20 --duration 10
+        python manage.py automodel_loadtest app01.user --mix list=50,search=30,change=20
+    """
+    help = "对已注册model的页面进行并发压力测试"
+
+    endpoints = ("list", "search", "page", "add", "change", "delete")
+
+    def add_arguments(self, parser):
+        parser.add_argument("model", help="app_label.model_name")
+        parser.add_argument("--clients", type=int, default=10, help="并发用户数")
+        parser.add_argument("--duration", type=float, default=10, help="持续秒数")
+        parser.add_argument("--mix", default="list=40,search=20,page=20,add=10,change=5,delete=5",
+                            help="各接口的请求比例")
+        parser.add_argument("--term", default="", help="搜索关键字，默认取第一条数据")
+        parser.add_argument("--in-place", action="store_true", help="直接使用原数据库")
+
+    def get_mix(self, value):
+        mix = {}
+        for item in value.split(","):
+            endpoint, _, weight = item.partition("=")
+            if endpoint not in self.endpoints:
+                raise CommandError("未知的接口：%s，可选：%s" % (endpoint, ",".join(self.endpoints)))
+            mix[endpoint] = float(weight or 1)
+        return mix
+
+    def get_config(self, label):
+        for model_class, config in automodel.site._registry.items():
+            if "%s.%s" % config.app_model_name == label:
+                return config
+        raise CommandError("%s未注册" % label)
+
+    def handle(self, *args, **options):
+        config = self.get_config(options["model"])
+        mix = self.get_mix(options["mix"])
+
+        sample = config.model_class.objects.first()
+        if sample is None:
+            raise CommandError("%s没有数据" % options["model"])
+        form = config.get_model_form_class()(instance=sample)
+        form_data = {name: form[name].value() for name in form.fields}
+        form_data = {name: value for name, value in form_data.items() if value is not None}
+        term = options["term"]
+        if not term and config.get_search_fields():
+            term = str(getattr(sample, config.get_search_fields()[0]))[:2]
+
+        temp_dir = None
+        database = connections.databases["default"]
+        if not options["in_place"]:
+            if database["ENGINE"] != "django.db.backends.sqlite3":
+                raise CommandError("仅sqlite支持临时副本，其他数据库请使用--in-place")
+            connections.close_all()
+            temp_dir = tempfile.mkdtemp()
+            name = os.path.join(temp_dir, os.path.basename(database["NAME"]))
+            shutil.copy(database["NAME"], name)
+            database["NAME"] = name
+
+        server = ThreadedWSGIServer(("127.0.0.1", 0), QuietHandler)
+        server.set_app(get_internal_wsgi_application())
+        server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+        server_thread.start()
+        host, port = server.server_address[:2]
+
+        stats = Stats()
+        try:
+            deadline = time.monotonic() + options["duration"]
+            clients = [threading.Thread(target=LoadClient(host, port, config, form_data, term).run,
+                                        args=(mix, deadline, stats))
+                       for _ in range(options["clients"])]
+            start = time.perf_counter()
+            for client in clients:
+                client.start()
+            for client in clients:
+                client.join()
+            elapsed = time.perf_counter() - start
+        finally:
+            server.shutdown()
+            server.server_close()
+            connections.close_all()
+            if temp_dir:
+                shutil.rmtree(temp_dir, ignore_errors=True)
+
+        self.report(stats, elapsed)
+
+    def report(self, stats, elapsed):
+        self.stdout.write("%-8s %8s %10s %9s %9s %9s %9s %8s" % (
+            "接口", "请求数", "请求/秒", "p50(ms)", "p90(ms)", "p99(ms)", "max(ms)", "错误率"))
+        total = errors = 0
+        for endpoint in self.endpoints:
+            values = sorted(stats.latency.get(endpoint, []))
+            if not values:
+                continue
+            total += len(values)
+            errors += stats.errors[endpoint]
+            self.stdout.write("%-8s %8d %10.1f %9.1f %9.1f %9.1f %9.1f %7.1f%%" % (
+                endpoint, len(values), len(values) / elapsed,
+                stats.percentile(values, 0.5) * 1000, stats.percentile(values, 0.9) * 1000,
+                stats.percentile(values, 0.99) * 1000, values[-1] * 1000,
+                stats.errors[endpoint] * 100 / len(values)))
+        if total:
+            self.stdout.write("共%s个请求，%.1f请求/秒，错误率%.1f%%" % (total, total / elapsed, errors * 100 / total))
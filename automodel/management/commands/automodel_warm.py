@@ -0,0 +1,80 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from automodel.services import automodel
+from automodel.services.version import cache_is_shared
+
+
+def warm_model(label, pages):
+    """在子进程中预热一个model，返回(名称, 页数, 耗时, 错误信息)"""
+    for model_class, config in automodel.site._registry.items():
+        if "%s.%s" % config.app_model_name == label:
+            break
+    else:
+        return label, 0, 0, "未注册"
+
+    start = time.perf_counter()
+    try:
+        pages = config.warm(pages)
+        error = ""
+    except Exception as e:
+        error = repr(e)
+    finally:
+        connections.close_all()
+    return label, pages, time.perf_counter() - start, error
+
+
+class Command(BaseCommand):
+    """
+    部署后、切换流量前预热已注册model的列表页面
+
+    用法：
+        python manage.py automodel_warm --pages 3 --processes 4
+        python manage.py automodel_warm app01.user
+
+    各model在本地进程池中并行预热，只预热写入django cache的内容：
+    开启list_cache的config的总条数和前几页数据，设置list_aggregates的config的汇总。
+    --pages最多为list_cache_pages，之后的页不会被缓存；未开启list_cache时只需预热第一页。
+    必须配置多进程共用的cache(如memcached、redis)，本地内存cache无法被web进程使用。
+    """
+    help = "预热已注册model的列表页面"
+
+    def add_arguments(self, parser):
+        parser.add_argument("models", nargs="*", help="app_label.model_name，默认全部已注册的model")
+        parser.add_argument("--pages", type=int, default=None, help="每个model预热的页数，默认为config的list_cache_pages")
+        parser.add_argument("--processes", type=int, default=None, help="进程数，默认为cpu核数")
+
+    def handle(self, *args, **options):
+        if not cache_is_shared():
+            raise CommandError("当前cache为进程内的cache，预热结果无法被web进程使用，请配置memcached、redis等共用的cache")
+
+        labels = []
+        for config in automodel.site._registry.values():
+            label = "%s.%s" % config.app_model_name
+            if options["models"] and label not in options["models"]:
+                continue
+            if not config.get_list_cache() and not config.get_list_aggregates():
+                self.stdout.write("%s: 未开启list_cache也未设置list_aggregates，没有可预热的内容，跳过" % label)
+                continue
+            if options["pages"] and options["pages"] > config.get_warm_pages():
+                self.stdout.write("%s: 只有前%s页会被缓存，只预热%s页" % (
+                    label, config.get_warm_pages(), config.get_warm_pages()))
+            labels.append(label)
+
+        # fork前关闭数据库连接，子进程各自建立连接
+        connections.close_all()
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=options["processes"],
+                                 mp_context=multiprocessing.get_context("fork")) as executor:
+            futures = [executor.submit(warm_model, label, options["pages"]) for label in labels]
+            for future in futures:
+                label, pages, seconds, error = future.result()
+                if error:
+                    self.stderr.write("%s: 预热失败 %s" % (label, error))
+                else:
+                    self.stdout.write("%s: %s页，%.3f秒" % (label, pages, seconds))
+        self.stdout.write("共%s个model，总耗时%.3f秒" % (len(labels), time.perf_counter() - start))
@@ -0,0 +1,29 @@
+# Generated by Django 2.2.28 on 2026-10-19 09:57
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditLog',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user', models.CharField(blank=True, max_length=150, verbose_name='操作用户')),
+                ('app_label', models.CharField(max_length=100, verbose_name='应用名称')),
+                ('model_name', models.CharField(max_length=100, verbose_name='表名称')),
+                ('object_id', models.CharField(blank=True, max_length=64, verbose_name='数据ID')),
+                ('object_repr', models.CharField(blank=True, max_length=200, verbose_name='数据')),
+                ('action', models.CharField(max_length=64, verbose_name='操作')),
+                ('changes', models.TextField(blank=True, verbose_name='修改内容')),
+                ('create_time', models.DateTimeField(default=django.utils.timezone.now, verbose_name='操作时间')),
+            ],
+        ),
+    ]
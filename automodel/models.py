@@ -0,0 +1,17 @@
+from django.db import models
+from django.utils import timezone
+
+
+class AuditLog(models.Model):
+    """操作记录表"""
+    user = models.CharField(verbose_name="操作用户", max_length=150, blank=True)
+    app_label = models.CharField(verbose_name="应用名称", max_length=100)
+    model_name = models.CharField(verbose_name="表名称", max_length=100)
+    object_id = models.CharField(verbose_name="数据ID", max_length=64, blank=True)
+    object_repr = models.CharField(verbose_name="数据", max_length=200, blank=True)
+    action = models.CharField(verbose_name="操作", max_length=64)
+    changes = models.TextField(verbose_name="修改内容", blank=True)
+    create_time = models.DateTimeField(verbose_name="操作时间", default=timezone.now)
+
+    def __str__(self):
+        return "%s %s %s.%s(%s)" % (self.user, self.action, self.app_label, self.model_name, self.object_id)
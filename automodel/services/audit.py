@@ -0,0 +1,143 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+
+from django.db import OperationalError, close_old_connections
+from django.db.models import Model, QuerySet
+
+logger = logging.getLogger(__name__)
+
+
+class AuditWriter:
+    """
+    操作记录的异步批量写入
+
+    请求中只把记录放入有界队列，由后台线程按批bulk_create写入数据库，
+    不增加请求的写入延时。
+
+    如何使用：
+        audit_writer.put(AuditLog(...))
+
+    队列满时put会阻塞等待(背压)，超过put_timeout仍无空位则在当前线程直接写入；
+    进程退出时会写入队列中剩余的记录。
+    数据库暂时不可写(如sqlite的database is locked)时按退避时间重试，重试仍失败才丢弃这一批。
+    """
+
+    def __init__(self, max_size=10000, batch_size=200, flush_interval=1.0, put_timeout=5.0,
+                 retries=3, retry_delay=0.1):
+        """
+        :param max_size: 队列最大长度
+        :param batch_size: 每批最多写入的条数
+        :param flush_interval: 没有凑满一批时，最长等待多少秒写入
+        :param put_timeout: 队列满时最长阻塞多少秒
+        :param retries: 写入出现OperationalError时的重试次数
+        :param retry_delay: 第一次重试前等待的秒数，之后每次加倍
+        """
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.queue = queue.Queue(maxsize=max_size)
+
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stop = object()
+        self._atexit_registered = False
+
+    def start(self):
+        """首次写入时启动后台线程"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self.run, name="automodel-audit", daemon=True)
+            self._thread.start()
+            if not self._atexit_registered:
+                atexit.register(self.close)
+                self._atexit_registered = True
+
+    def put(self, entry):
+        """放入一条记录"""
+        self.start()
+        try:
+            self.queue.put(entry, timeout=self.put_timeout)
+        except queue.Full:
+            logger.warning("操作记录队列已满，直接写入数据库")
+            self.write([entry])
+
+    def run(self):
+        """后台线程：按批取出记录并写入"""
+        while True:
+            batch = []
+            stop = False
+            try:
+                item = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            if item is self._stop:
+                stop = True
+            else:
+                batch.append(item)
+
+            # 尽量凑满一批
+            while not stop and len(batch) < self.batch_size:
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is self._stop:
+                    stop = True
+                else:
+                    batch.append(item)
+
+            if batch:
+                self.write(batch)
+            if stop:
+                return
+
+    def write(self, batch):
+        """批量写入数据库"""
+        from automodel.models import AuditLog
+
+        delay = self.retry_delay
+        for attempt in range(self.retries + 1):
+            close_old_connections()
+            try:
+                AuditLog.objects.bulk_create(batch, batch_size=self.batch_size)
+                return
+            except OperationalError:
+                if attempt == self.retries:
+                    logger.exception("写入%s条操作记录失败，已重试%s次", len(batch), self.retries)
+                    return
+                logger.warning("写入操作记录失败，%s秒后重试", delay)
+                time.sleep(delay)
+                delay *= 2
+            except Exception:
+                logger.exception("写入%s条操作记录失败", len(batch))
+                return
+            finally:
+                close_old_connections()
+
+    def close(self, timeout=10):
+        """停止后台线程，写入队列中剩余的记录"""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is None or not thread.is_alive():
+            return
+        self.queue.put(self._stop)
+        thread.join(timeout)
+
+
+def format_value(value):
+    """把字段值转为可写入json的值，关联对象记录主键"""
+    if isinstance(value, Model):
+        return value.pk
+    if isinstance(value, (QuerySet, list, tuple)):
+        return [format_value(item) for item in value]
+    return value
+
+
+audit_writer = AuditWriter()
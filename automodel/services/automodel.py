@@ -1,15 +1,35 @@
+import json
+import hashlib
+import threading
 from types import FunctionType, MethodType
 from functools import wraps
 
 from django.shortcuts import HttpResponse, render, reverse, redirect
+from django.http import StreamingHttpResponse, JsonResponse
+from django.template.loader import render_to_string
+from django.core.cache import cache
+from django.test import RequestFactory
+from django.conf import settings
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
 from django.urls import path
 from django.utils.safestring import mark_safe
 from django.forms import ModelForm
 from django.http.request import QueryDict
-from django.db.models import Q
+from django.db import models
+from django.db.models import Q, QuerySet, ProtectedError
+from django.core.exceptions import FieldDoesNotExist
+from django.template import Context
+from django.template.base import render_value_in_context
 
 
 from automodel.services.paginator import Pagination
+from automodel.services.audit import audit_writer, format_value
+from automodel.models import AuditLog
+from automodel.services.version import model_version
+from automodel.services.deletion import CascadeDeleter
+from automodel.services.singleflight import single_flight, cache_single_flight
+from automodel.services.widgets import AutocompleteSelect, AutocompleteSelectMultiple
 
 
 class ShowList:
@@ -33,8 +53,92 @@ class ShowList:
         self.actions = config.get_actions()
 
         # 分页展示
-        self.pager = Pagination(config.request, len(data_list), per_page_num=2)
-        self.data_list = ShowList.generate_list(data_list[self.pager.start:self.pager.end], config)
+        self.pager, self.page_list = config.get_page(data_list)
+        self.data_list = ShowList.generate_list(self.page_list, config)
+
+        # 汇总行
+        if isinstance(data_list, QuerySet):
+            self.aggregate_row, self.aggregate_extra = config.get_aggregate_rows(data_list)
+        else:
+            self.aggregate_row, self.aggregate_extra = None, []
+
+        # 快速渲染表格
+        self.fast_render = config.get_fast_render()
+        # 流式输出表格
+        self.stream_render = config.get_stream_render()
+
+    # 流式输出时表格行在页面中的占位
+    stream_marker = mark_safe("<!--automodel-rows-->")
+
+    # 无需转义的字段类型，直接str即可
+    plain_field_types = (models.AutoField, models.IntegerField, models.BooleanField, models.NullBooleanField)
+
+    def get_column_renderers(self):
+        """
+        按列预先确定渲染方式，避免逐个单元格走模板引擎
+        整数、布尔类型直接str(开启千分位时整数也需本地化)，其他类型与模板{{ col }}一样经过本地化和转义
+        """
+        context = Context(autoescape=True)
+        plain_types = self.plain_field_types
+        if settings.USE_L10N and settings.USE_THOUSAND_SEPARATOR:
+            plain_types = (models.BooleanField, models.NullBooleanField)
+        renderers = []
+        for item in self.list_display:
+            if isinstance(item, str):
+                try:
+                    field = self.model_class._meta.get_field(item)
+                except FieldDoesNotExist:
+                    field = None
+                renderers.append(self._field_renderer(item, isinstance(field, plain_types), context))
+            # 针对config类
+            elif isinstance(item, MethodType):
+                renderers.append(lambda data_obj, func=item: render_value_in_context(
+                    func(config=self.config, data_obj=data_obj), context))
+            # 针对model
+            elif isinstance(item, FunctionType):
+                renderers.append(lambda data_obj, func=item: render_value_in_context(func(data_obj), context))
+            else:
+                raise Exception("使用了无效字段！")
+        return renderers
+
+    @staticmethod
+    def _field_renderer(field_name, plain, context):
+        """生成某个字段列的渲染函数"""
+        def render_cell(data_obj):
+            if not hasattr(data_obj, field_name):
+                raise Exception("数据库没有该字段！")
+            value = getattr(data_obj, field_name)
+            if plain:
+                return str(value)
+            return render_value_in_context(value, context)
+        return render_cell
+
+    @staticmethod
+    def render_row(data_obj, renderers):
+        """生成一行的html"""
+        return "<tr>%s</tr>" % "".join(["<td>%s</td>" % renderer(data_obj) for renderer in renderers])
+
+    def tbody_html(self):
+        """直接生成表格的所有行"""
+        renderers = self.get_column_renderers()
+        return mark_safe("".join([self.render_row(data_obj, renderers) for data_obj in self.page_list]))
+
+    def iter_tbody_html(self, chunk_size):
+        """按块生成表格的行，QuerySet通过iterator()逐块读取，内存占用与每页条数无关"""
+        renderers = self.get_column_renderers()
+        if isinstance(self.page_list, QuerySet):
+            page_list = self.page_list.iterator(chunk_size=chunk_size)
+        else:
+            page_list = self.page_list
+
+        rows = []
+        for data_obj in page_list:
+            rows.append(self.render_row(data_obj, renderers))
+            if len(rows) >= chunk_size:
+                yield "".join(rows)
+                rows = []
+        if rows:
+            yield "".join(rows)
 
     @staticmethod
     def generate_list(data_list, config):
@@ -147,7 +251,8 @@ class AutomodelConfig:
         temp_model_form = type('TempModelForm', (ModelForm,), {
             'Meta': type('Meta', (object,), {
                 "model": self.model_class,
-                "fields": "__all__"
+                "fields": "__all__",
+                "widgets": self.get_autocomplete_widgets(),
             })
         })
 
@@ -202,21 +307,402 @@ class AutomodelConfig:
     def multi_delete(self, request):
         """批量删除"""
         pk_list = request.POST.getlist("pk")
-        self.model_class.objects.filter(pk__in=pk_list).delete()
+        queryset = self.model_class.objects.filter(pk__in=pk_list)
+        if self.get_delete_preview() and not request.POST.get("_confirm"):
+            return self.delete_preview_response(request, queryset, {"action": "multi_delete", "pk": pk_list})
+        try:
+            self.delete_queryset(queryset)
+        except ProtectedError:
+            return HttpResponse("存在禁止删除的关联数据，无法删除！")
+        if pk_list:
+            self.audit_log(request, "multi_delete", changes={"pk": pk_list})
         return HttpResponse("删除成功")
 
     multi_delete.short_description = "批量删除"
     actions = [multi_delete, ]
 
+    # 9. 每页显示条数
+    list_per_page = 2
+
+    def get_list_per_page(self):
+        return self.list_per_page
+
+    # 10. 快速渲染表格，跳过模板中逐个单元格的循环
+    fast_render = False
+
+    def get_fast_render(self):
+        if self.fast_render:
+            return True
+        return False
+
+    # 11. 流式输出列表页面，先发送页头，再分块发送表格行，最后发送分页
+    stream_render = False
+    stream_chunk_size = 100
+
+    def get_stream_render(self):
+        if self.stream_render:
+            return True
+        return False
+
+    def get_stream_chunk_size(self):
+        return self.stream_chunk_size
+
+    # 12. 外键/多对多字段使用输入联想，关联model需已注册并设置搜索字段
+    autocomplete_fields = []
+    autocomplete_per_page = 20
+
+    def get_autocomplete_fields(self):
+        result = []
+        if self.autocomplete_fields:
+            result.extend(self.autocomplete_fields)
+        return result
+
+    def get_autocomplete_per_page(self):
+        return self.autocomplete_per_page
+
+    def get_autocomplete_widgets(self):
+        """
+        为输入联想字段生成插件，关联model的联想接口由其config提供
+        关联model未注册或不提供联想时使用默认插件，否则下拉框中没有可选的数据
+        """
+        result = {}
+        for field_name in self.get_autocomplete_fields():
+            field = self.model_class._meta.get_field(field_name)
+            related_config = site._registry.get(field.related_model)
+            if not related_config or not related_config.get_autocomplete_search_field():
+                continue
+            if field.many_to_many:
+                result[field_name] = AutocompleteSelectMultiple(related_config.get_autocomplete_url())
+            else:
+                result[field_name] = AutocompleteSelect(related_config.get_autocomplete_url())
+        return result
+
+    def get_autocomplete_search_field(self):
+        """
+        联想匹配的字段，使用第一个本表的搜索字段，没有时不提供联想
+        跨表的搜索字段(如dep__caption)无法从对象上取得翻页位置，不用于联想
+        """
+        for field_name in self.get_search_fields():
+            if "__" in field_name:
+                continue
+            try:
+                field = self.model_class._meta.get_field(field_name)
+            except FieldDoesNotExist:
+                continue
+            if field.concrete and not field.is_relation:
+                return field_name
+        return None
+
+    def get_autocomplete_queryset(self, term, after_value=None, after_pk=None):
+        """
+        联想查询：字段前缀的范围条件，按(字段, 主键)排序，从上一页最后一条之后继续取
+        范围条件区分大小写，可以利用字段上的索引；__startswith在sqlite中为LIKE，无法使用索引
+        """
+        field_name = self.get_autocomplete_search_field()
+        queryset = self.model_class.objects.order_by(field_name, "pk")
+        if term:
+            queryset = queryset.filter(**{"%s__gte" % field_name: term, "%s__lt" % field_name: term + chr(0x10ffff)})
+        if after_value is not None and after_pk is not None:
+            queryset = queryset.filter(Q(**{"%s__gt" % field_name: after_value}) |
+                                       Q(**{field_name: after_value, "pk__gt": after_pk}))
+        return queryset
+
+    # 13. 操作记录，由后台线程批量写入AuditLog表
+    audit = False
+
+    def get_audit(self):
+        if self.audit:
+            return True
+        return False
+
+    def audit_log(self, request, action, obj=None, changes=None):
+        """记录一次操作，请求中只放入队列"""
+        if not self.get_audit():
+            return
+        user = getattr(request, "user", None)
+        audit_writer.put(AuditLog(
+            user=user.get_username() if user is not None and user.is_authenticated else "",
+            app_label=self.app_name,
+            model_name=self.model_name,
+            object_id=str(obj.pk) if obj is not None else "",
+            object_repr=str(obj)[:200] if obj is not None else "",
+            action=action,
+            changes=json.dumps(changes, ensure_ascii=False, default=str) if changes else "",
+        ))
+
+    # 不记录内容的字段，名称中含password的字段总是不记录
+    audit_exclude_fields = []
+
+    def get_audit_exclude_fields(self):
+        result = []
+        if self.audit_exclude_fields:
+            result.extend(self.audit_exclude_fields)
+        for field in self.model_class._meta.fields:
+            if "password" in field.name and field.name not in result:
+                result.append(field.name)
+        return result
+
+    def get_form_changes(self, form):
+        """表单修改过的字段：{字段: [原值, 新值]}，不记录内容的字段只记录被修改"""
+        exclude_fields = self.get_audit_exclude_fields()
+        changes = {}
+        for field_name in form.changed_data:
+            if field_name in exclude_fields:
+                changes[field_name] = ["******", "******"]
+                continue
+            changes[field_name] = [format_value(form.initial.get(field_name)),
+                                   format_value(form.cleaned_data.get(field_name))]
+        return changes
+
+    # 14. 列表汇总行，当前搜索条件下一次aggregate()查询算出
+    # {展示列: 聚合}显示在该列下方，如{"id": Count("id")}；
+    # 其他key作为名称另起一行显示，如{"研发部人数": Count("id", filter=Q(dep__caption="研发部"))}
+    # 结果按本model和关联model的数据版本缓存，多进程时需配置共用的cache(见automodel.W001检查)
+    list_aggregates = {}
+    list_aggregates_timeout = 300
+
+    def get_list_aggregates(self):
+        result = {}
+        if self.list_aggregates:
+            result.update(self.list_aggregates)
+        return result
+
+    def get_aggregates(self, data_list):
+        """计算汇总结果，按(数据版本, 查询语句)缓存"""
+        list_aggregates = self.get_list_aggregates()
+        if not list_aggregates:
+            return {}
+        # 聚合的定义也作为key的一部分，修改list_aggregates后不会取到旧结果
+        query_hash = hashlib.md5(("%s%r" % (data_list.query, sorted(list_aggregates.items()))).encode("utf-8")
+                                 ).hexdigest()
+        # 汇总可能按关联表过滤，关联model的版本也作为key的一部分
+        key = "automodel:aggregates:%s.%s:%s:%s" % (self.app_name, self.model_name,
+                                                   "-".join(map(str, self.get_versions())), query_hash)
+        result = cache.get(key)
+        if result is None:
+            # 使用内部别名，避免与字段名冲突
+            aliases = {"aggregate_%s" % index: column for index, column in enumerate(list_aggregates)}
+            values = data_list.aggregate(**{alias: list_aggregates[column] for alias, column in aliases.items()})
+            result = {column: values[alias] for alias, column in aliases.items()}
+            cache.set(key, result, self.list_aggregates_timeout)
+        return result
+
+    def get_aggregate_rows(self, data_list):
+        """
+        :return: (与展示列对齐的汇总行, [(名称, 值)])
+        """
+        aggregates = self.get_aggregates(data_list)
+        if not aggregates:
+            return None, []
+        list_aggregates = self.get_list_aggregates()
+        columns = [item for item in self.get_list_display() if isinstance(item, str)]
+
+        row = None
+        if any(column in aggregates for column in columns):
+            row = []
+            for index, item in enumerate(self.get_list_display()):
+                if isinstance(item, str) and item in aggregates:
+                    # 组合的表达式(如Sum("id") * 2)没有name，使用展示列的名称
+                    row.append("%s: %s" % (getattr(list_aggregates[item], "name", item), aggregates[item]))
+                elif index == 0:
+                    row.append("汇总")
+                else:
+                    row.append("")
+        extra = [(key, value) for key, value in aggregates.items() if key not in columns]
+        return row, extra
+
+    # 15. 合并相同的并发列表请求，只有一个请求查询数据库，其余请求等待并共用结果
+    # coalesce_across_processes通过cache在进程间合并，需配置多进程共用的cache(见automodel.W001检查)
+    coalesce_requests = False
+    coalesce_across_processes = False
+    coalesce_timeout = 10
+
+    def get_coalesce_requests(self):
+        if self.coalesce_requests:
+            return True
+        return False
+
+    def get_single_flight(self):
+        if self.coalesce_across_processes:
+            return cache_single_flight
+        return single_flight
+
+    def get_coalesce_key(self):
+        """(model, 排序后的GET参数, 数据版本)"""
+        params = sorted((key, sorted(values)) for key, values in self.request.GET.lists())
+        params_hash = hashlib.md5(repr(params).encode("utf-8")).hexdigest()
+        return "%s.%s:%s:%s" % (self.app_name, self.model_name, model_version.get(self.model_class), params_hash)
+
+    def get_pager(self, data_length):
+        return Pagination(self.request, data_length, per_page_num=self.get_list_per_page())
+
+    def load_page(self, data_list):
+        """查询总条数和当前页的数据"""
+        data_length = self.get_count(data_list)
+        pager = self.get_pager(data_length)
+        return data_length, list(self.get_page_list(data_list, pager))
+
+    def get_page(self, data_list):
+        """
+        分页：返回分页器和当前页的数据
+        QuerySet用count()计数，避免把全部数据读入内存
+        """
+        if not isinstance(data_list, QuerySet):
+            pager = self.get_pager(len(data_list))
+            return pager, data_list[pager.start:pager.end]
+
+        if self.get_coalesce_requests():
+            data_length, page_list = self.get_single_flight().do(
+                self.get_coalesce_key(), lambda: self.load_page(data_list), self.coalesce_timeout)
+            return self.get_pager(data_length), page_list
+
+        pager = self.get_pager(self.get_count(data_list))
+        return pager, self.get_page_list(data_list, pager)
+
+    # 16. 删除前预览级联删除的数据
+    delete_preview = False
+
+    def get_delete_preview(self):
+        if self.delete_preview:
+            return True
+        return False
+
+    # 17. 没有需要逐个对象处理的删除信号时，用批量SQL删除
+    fast_delete = False
+    delete_batch_size = 1000
+
+    def get_fast_delete(self):
+        if self.fast_delete:
+            return True
+        return False
+
+    def delete_queryset(self, queryset):
+        """删除数据及级联的关联数据"""
+        if self.get_fast_delete():
+            CascadeDeleter(queryset).delete(self.delete_batch_size)
+        else:
+            queryset.delete()
+
+    def delete_preview_response(self, request, queryset, params):
+        """
+        级联删除预览页面
+        :param params: 确认删除时需要再次提交的数据
+        """
+        deleter = CascadeDeleter(queryset)
+        return render(request, "automodel/delete_list.html", {
+            "preview": deleter.preview(),
+            "protected": deleter.protected,
+            "params": params,
+            "list_url": self.get_list_url(),
+        })
+
+    # 18. 条件GET，数据没有变化时列表页面和修改页面直接返回304
+    # 需配置多进程共用的cache，否则其他进程写入后本进程的版本号不变，会返回过期的304(见automodel.W001检查)
+    # QuerySet.update()、bulk_create()和原生SQL不发送信号，之后需调用model_version.bump(model_class)
+    conditional_get = False
+
+    def get_conditional_get(self):
+        if self.conditional_get:
+            return True
+        return False
+
+    def get_related_models(self):
+        """页面中会显示的关联model(外键、多对多)"""
+        result = []
+        for field in self.model_class._meta.fields + self.model_class._meta.many_to_many:
+            if field.is_relation and field.related_model not in result:
+                result.append(field.related_model)
+        return result
+
+    def get_versions(self):
+        """本model和关联model的数据版本"""
+        return [model_version.get(model_class) for model_class in [self.model_class] + self.get_related_models()]
+
+    def get_etag(self, request, *args, **kwargs):
+        """由数据版本、url、GET参数、用户和csrf cookie计算，不执行任何列表查询"""
+        versions = self.get_versions()
+        params = sorted((key, sorted(values)) for key, values in request.GET.lists())
+        user = getattr(request, "user", None)
+        value = repr((versions, request.path, params, user.pk if user is not None else None,
+                      request.COOKIES.get(settings.CSRF_COOKIE_NAME)))
+        return hashlib.md5(value.encode("utf-8")).hexdigest()
+
+    def conditional(self, view_func):
+        """
+        条件GET，设置ETag，请求头If-None-Match匹配时返回304
+        不设置Last-Modified：http时间只精确到秒，同一秒内的修改会让只带If-Modified-Since的请求得到过期的304
+        """
+        conditional_view = condition(etag_func=self.get_etag)(view_func)
+
+        def inner(request, *args, **kwargs):
+            if not self.get_conditional_get():
+                return view_func(request, *args, **kwargs)
+            response = conditional_view(request, *args, **kwargs)
+            # 浏览器每次都需要验证，不直接使用本地缓存
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return inner
+
+    # 19. 缓存总条数和前list_cache_pages页的数据，按(数据版本, 查询语句)缓存
+    # 需配置多进程共用的cache(如memcached、redis)，否则其他进程写入后仍返回旧数据(见automodel.W001检查)，
+    # automodel_warm也无法为web进程预热
+    list_cache = False
+    list_cache_pages = 1
+    list_cache_timeout = 300
+
+    def get_list_cache(self):
+        if self.list_cache:
+            return True
+        return False
+
+    def get_list_cache_key(self, kind, queryset):
+        query_hash = hashlib.md5(str(queryset.query).encode("utf-8")).hexdigest()
+        # 搜索条件可能跨关联表，关联model的版本也作为key的一部分
+        return "automodel:%s:%s.%s:%s:%s" % (kind, self.app_name, self.model_name,
+                                            "-".join(map(str, self.get_versions())), query_hash)
+
+    def get_count(self, data_list):
+        """总条数"""
+        if not self.get_list_cache():
+            return data_list.count()
+        key = self.get_list_cache_key("count", data_list)
+        count = cache.get(key)
+        if count is None:
+            count = data_list.count()
+            cache.set(key, count, self.list_cache_timeout)
+        return count
+
+    def get_page_list(self, data_list, pager):
+        """当前页的数据"""
+        page_list = data_list[pager.start:pager.end]
+        if not self.get_list_cache() or pager.current_page > self.list_cache_pages:
+            return page_list
+        key = self.get_list_cache_key("page", page_list)
+        result = cache.get(key)
+        if result is None:
+            result = list(page_list)
+            cache.set(key, result, self.list_cache_timeout)
+        return result
+
     def __init__(self, model_class):
         self.model_class = model_class
         self.model_name = model_class._meta.model_name
         self.app_name = model_class._meta.app_label
         self.app_model_name = self.app_name, self.model_name
+        # 每个线程的request互不影响
+        self._local = threading.local()
         self.request = None
         self._query_key = "_listfilter"
         self.search_key = "_query"
 
+    @property
+    def request(self):
+        return getattr(self._local, "request", None)
+
+    @request.setter
+    def request(self, request):
+        self._local.request = request
+
     # ######### URL相关
     def wrap(self, view_func):
         """通过视图函数给对象的request赋值"""
@@ -229,10 +715,12 @@ class AutomodelConfig:
     def get_urls(self):
         """获取url"""
         url_list = [
-            path('', self.wrap(self.show_list_view), name="%s_%s_show" % self.app_model_name),
+            path('', self.wrap(self.conditional(self.show_list_view)), name="%s_%s_show" % self.app_model_name),
             path('add/', self.wrap(self.add_list_view), name="%s_%s_add" % self.app_model_name),
-            path('<int:obj_id>/change/', self.wrap(self.change_list_view), name="%s_%s_change" % self.app_model_name),
+            path('<int:obj_id>/change/', self.wrap(self.conditional(self.change_list_view)),
+                 name="%s_%s_change" % self.app_model_name),
             path('<int:obj_id>/delete/', self.wrap(self.delete_list_view), name="%s_%s_delete" % self.app_model_name),
+            path('autocomplete/', self.wrap(self.autocomplete_view), name="%s_%s_autocomplete" % self.app_model_name),
         ]
         url_list.extend(self.extra_url())
         return url_list
@@ -257,21 +745,33 @@ class AutomodelConfig:
                     return ret
         data_list = self.model_class.objects.filter(self.get_search_condition())
         content = ShowList(self, data_list)
+        if content.stream_render:
+            return self.stream_list_response(request, content)
 
         return render(request, "automodel/show_list.html", {"content": content})
 
+    def stream_list_response(self, request, content):
+        """流式响应：页头和分页在返回前渲染好，表格行在发送时逐块生成"""
+        html = render_to_string("automodel/show_list.html", {"content": content}, request)
+        head, tail = html.split(content.stream_marker)
+
+        def stream():
+            yield head
+            yield from content.iter_tbody_html(self.get_stream_chunk_size())
+            yield tail
+        return StreamingHttpResponse(stream())
+
     def add_list_view(self, request, *args, **kwargs):
-        class TempModelForm(ModelForm):
-            class Meta:
-                model = self.model_class
-                fields = "__all__"
+        TempModelForm = self.get_model_form_class()
         if request.method == "GET":
             return render(request, "automodel/add_list.html", {"form": TempModelForm()})
         form = TempModelForm(data=request.POST)
         if not form.is_valid():
             return render(request, "automodel/add_list.html", {"form": form})
         else:
-            form.save()
+            changes = self.get_form_changes(form)
+            obj = form.save()
+            self.audit_log(request, "add", obj, changes)
             return redirect(self.get_list_url())
 
     def change_list_view(self, request, *args, **kwargs):
@@ -291,7 +791,9 @@ class AutomodelConfig:
         if not form.is_valid():
             return render(request, "automodel/change_list.html", {"form": form})
         else:
+            changes = self.get_form_changes(form)
             form.save()
+            self.audit_log(request, "change", obj, changes)
             return redirect(self.get_list_url()+"?%s" % request.GET.get(self._query_key))
 
     def delete_list_view(self, request, *args, **kwargs):
@@ -299,13 +801,78 @@ class AutomodelConfig:
         删除视图
         """
         # 验证删除目标是否存在
-        obj = self.model_class.objects.filter(id=kwargs.get("obj_id")).first()
+        queryset = self.model_class.objects.filter(id=kwargs.get("obj_id"))
+        obj = queryset.first()
         if not obj:
             return HttpResponse("数据不存在！")
 
-        self.model_class.objects.filter(id=kwargs.get("obj_id")).delete()
+        # get请求先预览，post请求确认删除
+        if self.get_delete_preview() and request.method == "GET":
+            return self.delete_preview_response(request, queryset, {})
+
+        try:
+            self.delete_queryset(queryset)
+        except ProtectedError:
+            return HttpResponse("存在禁止删除的关联数据，无法删除！")
+        self.audit_log(request, "delete", obj)
         return redirect(self.get_list_url()+"?%s" % request.GET.get(self._query_key))
 
+    def autocomplete_view(self, request, *args, **kwargs):
+        """
+        输入联想接口
+        GET参数：term 关键字，after_value/after_pk 上一页最后一条的字段值和主键
+        返回：{"results": [{"id": 主键, "text": 显示内容}], "more": 是否还有下一页,
+              "next": {"after_value": 字段值, "after_pk": 主键}}
+        """
+        field_name = self.get_autocomplete_search_field()
+        if not field_name:
+            return JsonResponse({"results": [], "more": False, "next": None})
+
+        term = request.GET.get("term", "").strip()
+        after_value = request.GET.get("after_value")
+        try:
+            after_pk = int(request.GET["after_pk"])
+        except (KeyError, ValueError):
+            after_pk = None
+        per_page = self.get_autocomplete_per_page()
+
+        # 多取一条判断是否还有下一页，避免count()
+        obj_list = list(self.get_autocomplete_queryset(term, after_value, after_pk)[:per_page + 1])
+        more = len(obj_list) > per_page
+        obj_list = obj_list[:per_page]
+        return JsonResponse({
+            "results": [{"id": obj.pk, "text": str(obj)} for obj in obj_list],
+            "more": more,
+            "next": {"after_value": getattr(obj_list[-1], field_name), "after_pk": obj_list[-1].pk} if more else None,
+        })
+
+    # #############     预热
+    def get_warm_pages(self, pages=None):
+        """
+        实际会写入缓存的页数，pages超出时取上限
+        只有前list_cache_pages页的数据会被缓存；总条数和汇总与页码无关，只需请求第一页
+        """
+        limit = self.list_cache_pages if self.get_list_cache() else 1
+        if pages is None:
+            return limit
+        return min(pages, limit)
+
+    def warm(self, pages=None):
+        """
+        预热：请求前pages页列表页面，默认且最多为get_warm_pages()页
+        开启list_cache时写入总条数和各页数据的缓存，设置list_aggregates时写入汇总的缓存，
+        其余(表单类、url反向解析等)只在本进程中有效，不会预热web进程
+        :return: 预热的页数
+        """
+        factory = RequestFactory()
+        list_view = self.wrap(self.show_list_view)
+        pages = self.get_warm_pages(pages)
+        for page in range(1, pages + 1):
+            response = list_view(factory.get(self.get_list_url(), {"page": page}))
+            if response.streaming:
+                b"".join(response.streaming_content)
+        return pages
+
     # #############     定制列表页面显示的列
     def checkbox(self, data_obj=None, is_header=False, config=None):
         """勾选框"""
@@ -352,6 +919,9 @@ class AutomodelConfig:
     def get_delete_url(self, nid):
         return reverse("automodel:%s_%s_delete" % self.app_model_name, args=(nid, ))
 
+    def get_autocomplete_url(self):
+        return reverse("automodel:%s_%s_autocomplete" % self.app_model_name)
+
 
 class AutomodelSite:
     """配置每一个model的路由"""
@@ -364,6 +934,9 @@ class AutomodelSite:
         if not config_class:
             config_class = AutomodelConfig
         self._registry[model_class] = config_class(model_class)
+        model_version.watch(model_class)
+        for related_model in self._registry[model_class].get_related_models():
+            model_version.watch(related_model)
 
     def get_urls(self):
         """分发url"""
@@ -0,0 +1,122 @@
+from django.db import transaction
+from django.db.models import CASCADE, SET_NULL, PROTECT, DO_NOTHING, ProtectedError
+from django.db.models.deletion import get_candidate_relations_to_delete
+from django.db.models.signals import pre_delete, post_delete
+
+from automodel.services.version import model_version
+
+
+class CascadeDeleter:
+    """
+    级联删除
+
+    按外键关系逐层生成子查询，预览时用count()统计每个关联表受影响的条数；
+    没有需要逐个对象处理的信号时，用批量SQL从最底层的关联表开始删除，
+    不把关联数据读入内存。否则交给django的delete()处理。
+
+    如何使用：
+        deleter = CascadeDeleter(queryset)
+        deleter.preview()
+        deleter.delete()
+    """
+
+    action_names = {"delete": "删除", "set_null": "置空", "protect": "禁止删除", "unknown": "未知",
+                    "invalid": "on_delete无效，禁止删除"}
+
+    def __init__(self, queryset):
+        """
+        :param queryset: 要删除的数据
+        """
+        self.queryset = queryset
+        self.model_class = queryset.model
+        # 执行顺序：关联表在前，被关联的表在后
+        self.steps = []
+        self.fast = True
+        self.collect(self.model_class, queryset, (self.model_class, ))
+
+    def collect(self, model_class, queryset, path):
+        """
+        :param model_class: 要删除的model
+        :param queryset: 要删除的数据
+        :param path: 级联路径，用于发现循环引用
+        """
+        for related in get_candidate_relations_to_delete(model_class._meta):
+            field = related.field
+            on_delete = field.remote_field.on_delete
+            related_model = related.related_model
+            sub_queryset = related_model._base_manager.filter(**{"%s__in" % field.name: queryset})
+
+            if not callable(on_delete):
+                # 如on_delete=False，django删除时会抛出TypeError，按禁止删除处理
+                self.steps.append((related_model, sub_queryset, "invalid", field))
+            elif on_delete is CASCADE:
+                if related_model in path:
+                    # 循环引用无法确定删除顺序
+                    self.fast = False
+                    self.steps.append((related_model, sub_queryset, "delete", field))
+                else:
+                    self.collect(related_model, sub_queryset, path + (related_model, ))
+            elif on_delete is SET_NULL:
+                self.steps.append((related_model, sub_queryset, "set_null", field))
+            elif on_delete is PROTECT:
+                self.steps.append((related_model, sub_queryset, "protect", field))
+            elif on_delete is not DO_NOTHING:
+                self.fast = False
+                self.steps.append((related_model, sub_queryset, "unknown", field))
+
+        if self.has_receivers(model_class) or model_class._meta.parents or any(
+                hasattr(field, "bulk_related_objects") for field in model_class._meta.private_fields):
+            self.fast = False
+        self.steps.append((model_class, queryset, "delete", None))
+
+    @staticmethod
+    def has_receivers(model_class):
+        """是否有除了数据版本号之外的删除信号"""
+        for signal in (pre_delete, post_delete):
+            for receiver in signal._live_receivers(model_class):
+                if receiver not in model_version.receivers:
+                    return True
+        return False
+
+    def preview(self):
+        """
+        每个表受影响的条数
+        :return: [(表名, 操作, 条数)]
+        """
+        result = []
+        for model_class, queryset, action, field in reversed(self.steps):
+            count = queryset.count()
+            if count:
+                result.append((model_class._meta.verbose_name, self.action_names[action], count))
+        return result
+
+    @property
+    def protected(self):
+        """是否存在禁止删除或on_delete无效的关联数据"""
+        return any(action in ("protect", "invalid") and queryset.exists()
+                   for model_class, queryset, action, field in self.steps)
+
+    def delete(self, batch_size=1000):
+        """
+        删除数据
+        :param batch_size: 批量删除时每批的条数
+        """
+        with transaction.atomic(using=self.queryset.db):
+            if self.protected:
+                raise ProtectedError("存在禁止删除的关联数据", list(self.queryset))
+
+            if not self.fast:
+                self.queryset.delete()
+                return
+
+            pk_list = list(self.queryset.values_list("pk", flat=True))
+            for start in range(0, len(pk_list), batch_size):
+                batch = self.model_class._base_manager.filter(pk__in=pk_list[start:start + batch_size])
+                for model_class, queryset, action, field in CascadeDeleter(batch).steps:
+                    if action == "delete":
+                        queryset._raw_delete(queryset.db)
+                    elif action == "set_null":
+                        queryset.update(**{field.name: None})
+
+        for model_class in {step[0] for step in self.steps}:
+            model_version.bump(model_class)
@@ -0,0 +1,165 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connection, transaction
+from django.db.models import Index
+from django.test import RequestFactory
+
+
+class QueryCaptured(Exception):
+    """已拿到SQL，中止执行"""
+
+
+class IndexAdvisor:
+    """
+    索引建议
+
+    按show_list_view和输入联想接口的实际逻辑生成查询：搜索条件下的count()、当前页的LIMIT/OFFSET查询、
+    无搜索条件的count()和当前页、联想的范围查询；拿到SQL后不执行，
+    在数据库上执行EXPLAIN QUERY PLAN找出全表扫描和临时排序。
+    再在回滚的事务中为查询中实际出现的条件和排序字段试建索引，只有执行计划中用到的索引才会被建议。
+
+    仅支持sqlite。
+
+    如何使用：
+        advisor = IndexAdvisor(config)
+        for item in advisor.check():
+            ...
+        advisor.suggested_indexes
+    """
+
+    def __init__(self, config, term="x"):
+        """
+        :param config: AutomodelConfig对象
+        :param term: 生成搜索查询时使用的关键字
+        """
+        self.config = config
+        self.model_class = config.model_class
+        self.term = term
+        self.suggested_indexes = []
+
+    @staticmethod
+    def capture_sql(func):
+        """取func执行的第一条SQL，不真正执行"""
+        captured = []
+
+        def wrapper(execute, sql, params, many, context):
+            captured.append((sql, params))
+            raise QueryCaptured()
+
+        with connection.execute_wrapper(wrapper):
+            try:
+                func()
+            except QueryCaptured:
+                pass
+        return captured[0]
+
+    def get_concrete_fields(self, field_names):
+        """只保留本表的字段，跨表的查询条件不在本表建索引"""
+        result = []
+        for field_name in field_names:
+            try:
+                field = self.model_class._meta.get_field(field_name.lstrip("-"))
+            except FieldDoesNotExist:
+                continue
+            if field.concrete and not field.primary_key and not field.many_to_many and field.name not in result:
+                result.append(field.name)
+        return result
+
+    def get_list_queries(self, params, desc):
+        """列表页面在给定GET参数下的count()和当前页查询"""
+        factory = RequestFactory()
+        self.config.request = factory.get(self.config.get_list_url(), params)
+        try:
+            data_list = self.model_class.objects.filter(self.config.get_search_condition())
+            pager = self.config.get_pager(0)
+            page_list = data_list[pager.start:pager.end]
+        finally:
+            self.config.request = None
+        return [
+            ("%s count()" % desc, self.capture_sql(data_list.count)),
+            ("%s 当前页" % desc, self.capture_sql(lambda: list(page_list))),
+        ]
+
+    def get_queries(self):
+        """生成(说明, (sql, params), 可建索引的字段)"""
+        ordering = self.get_concrete_fields(self.model_class._meta.ordering)
+        queries = []
+
+        for desc, sql in self.get_list_queries({}, "列表"):
+            queries.append((desc, sql, ordering))
+
+        if self.config.get_show_search_form() and self.config.get_search_fields():
+            search_fields = self.get_concrete_fields(self.config.get_search_fields())
+            for desc, sql in self.get_list_queries({self.config.search_key: self.term}, "搜索"):
+                queries.append((desc, sql, search_fields + [name for name in ordering if name not in search_fields]))
+
+        field_name = self.config.get_autocomplete_search_field()
+        if field_name:
+            queryset = self.config.get_autocomplete_queryset(self.term)[:self.config.get_autocomplete_per_page() + 1]
+            queries.append(("联想 %s前缀" % field_name, self.capture_sql(lambda: list(queryset)),
+                            self.get_concrete_fields([field_name])))
+        return queries
+
+    @staticmethod
+    def explain(sql, params):
+        """执行计划的每一行"""
+        with connection.cursor() as cursor:
+            cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    @staticmethod
+    def is_bad_plan(plan):
+        """全表扫描或临时排序"""
+        for detail in plan:
+            if detail.startswith("SCAN") and "INDEX" not in detail:
+                return True
+            if "TEMP B-TREE" in detail:
+                return True
+        return False
+
+    def get_index(self, field_name):
+        index = Index(fields=[field_name])
+        index.set_name_with_model(self.model_class)
+        return index
+
+    def try_indexes(self, indexes, sql, params):
+        """在回滚的事务中试建索引，返回新的执行计划"""
+        quote_name = connection.ops.quote_name
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                for index in indexes:
+                    field = self.model_class._meta.get_field(index.fields[0])
+                    cursor.execute("CREATE INDEX %s ON %s (%s)" % (
+                        quote_name(index.name), quote_name(self.model_class._meta.db_table),
+                        quote_name(field.column)))
+            plan = self.explain(sql, params)
+            transaction.set_rollback(True)
+        return plan
+
+    def check(self):
+        """
+        逐条检查查询
+        :return: [(说明, 执行计划, 结论)]
+        """
+        result = []
+        suggested = {}
+        for desc, (sql, params), field_names in self.get_queries():
+            plan = self.explain(sql, params)
+            if not self.is_bad_plan(plan):
+                result.append((desc, plan, "使用索引"))
+                continue
+            if not field_names:
+                result.append((desc, plan, "全表扫描，查询中没有可建索引的条件或排序"))
+                continue
+
+            indexes = [self.get_index(field_name) for field_name in field_names]
+            new_plan = self.try_indexes(indexes, sql, params)
+            used = [index for index in indexes if any(index.name in detail for detail in new_plan)]
+            if self.is_bad_plan(new_plan) or not used:
+                result.append((desc, plan, "全表扫描，索引无法改善"))
+                continue
+            for index in used:
+                suggested[index.name] = index
+            result.append((desc, plan, "全表扫描，建议索引 %s" % ", ".join(index.name for index in used)))
+
+        self.suggested_indexes = list(suggested.values())
+        return result
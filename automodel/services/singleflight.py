@@ -0,0 +1,106 @@
+import threading
+import time
+
+from django.core.cache import cache
+
+
+class Call:
+    """一次正在进行的计算"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    合并相同key的并发计算
+
+    同一进程内，同一时刻相同key只有一个线程真正计算，其余线程等待并共用其结果；
+    等待超时或计算出错时，等待的线程自己计算。
+
+    如何使用：
+        result = single_flight.do(key, func, timeout=10)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func, timeout=10):
+        """
+        :param key: 相同key的计算会被合并
+        :param func: 无参数的计算函数
+        :param timeout: 最长等待秒数
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Call()
+
+        if not leader:
+            if call.event.wait(timeout) and call.error is None:
+                return call.result
+            return func()
+
+        try:
+            call.result = func()
+        except Exception as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+        return call.result
+
+
+class CacheSingleFlight(SingleFlight):
+    """
+    在进程内合并的基础上，通过django的cache锁在多进程间合并
+
+    拿到锁的进程计算并把结果写入cache，其余进程轮询cache取结果。
+    需配置多进程共用、add()为原子操作的cache(如memcached、redis)。
+    """
+
+    key_prefix = "automodel:singleflight"
+
+    def __init__(self, poll_interval=0.05):
+        super().__init__()
+        self.poll_interval = poll_interval
+
+    def do(self, key, func, timeout=10):
+        return super().do(key, lambda: self.do_across_processes(key, func, timeout), timeout)
+
+    def do_across_processes(self, key, func, timeout):
+        result_key = "%s:result:%s" % (self.key_prefix, key)
+        lock_key = "%s:lock:%s" % (self.key_prefix, key)
+
+        result = cache.get(result_key)
+        if result is not None:
+            return result
+
+        if cache.add(lock_key, 1, timeout):
+            try:
+                result = func()
+                cache.set(result_key, result, timeout)
+                return result
+            finally:
+                cache.delete(lock_key)
+
+        # 等待拿到锁的进程写入结果，锁已释放仍无结果(计算出错)或超时则自己计算
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            result = cache.get(result_key)
+            if result is not None:
+                return result
+            if cache.get(lock_key) is None:
+                break
+        return func()
+
+
+single_flight = SingleFlight()
+cache_single_flight = CacheSingleFlight()
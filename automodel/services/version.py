@@ -0,0 +1,74 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_save, post_delete, m2m_changed
+
+
+class ModelVersion:
+    """
+    每个model的数据版本号，数据有写入时递增
+
+    版本号保存在django的cache中，多进程共用同一cache时各进程一致。
+    缓存与版本号一起作为key，版本变化后旧缓存自然失效。
+
+    如何使用：
+        model_version.watch(model_class)
+        version = model_version.get(model_class)
+    """
+
+    key_prefix = "automodel:version"
+
+    def __init__(self):
+        # 已连接的信号处理函数，批量删除时据此判断是否还有其他信号
+        self.receivers = set()
+
+    def get_key(self, model_class):
+        return "%s:%s.%s" % (self.key_prefix, model_class._meta.app_label, model_class._meta.model_name)
+
+    @staticmethod
+    def initial():
+        # 以毫秒时间作为初始值，cache清除后重新生成的版本号不会与旧版本号重复
+        return int(time.time() * 1000)
+
+    def get(self, model_class):
+        """获取当前版本号"""
+        key = self.get_key(model_class)
+        version = cache.get(key)
+        if version is None:
+            cache.add(key, self.initial(), None)
+            version = cache.get(key)
+        return version
+
+    def bump(self, model_class):
+        """版本号加一"""
+        key = self.get_key(model_class)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, self.initial(), None)
+
+    def watch(self, model_class):
+        """监听model的增删改，自动递增版本号"""
+        def receiver(sender, **kwargs):
+            # m2m_changed只在修改完成后递增
+            if kwargs.get("action", "post_").startswith("post_"):
+                self.bump(model_class)
+
+        self.receivers.add(receiver)
+        uid = self.get_key(model_class)
+        post_save.connect(receiver, sender=model_class, weak=False, dispatch_uid=uid)
+        post_delete.connect(receiver, sender=model_class, weak=False, dispatch_uid=uid)
+        for field in model_class._meta.many_to_many:
+            m2m_changed.connect(receiver, sender=field.remote_field.through, weak=False,
+                                dispatch_uid="%s:%s" % (uid, field.name))
+
+
+def cache_is_shared(alias="default"):
+    """cache是否可能被多个进程共用，本地内存和dummy cache为进程内"""
+    backend = settings.CACHES[alias]["BACKEND"]
+    return backend not in ("django.core.cache.backends.locmem.LocMemCache",
+                           "django.core.cache.backends.dummy.DummyCache")
+
+
+model_version = ModelVersion()
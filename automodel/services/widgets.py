@@ -0,0 +1,61 @@
+from django import forms
+from django.core.exceptions import ValidationError
+
+
+class AutocompleteMixin:
+    """
+    外键/多对多字段的输入联想插件
+
+    只渲染已选中的选项，其余选项由页面js向关联model的联想接口分页获取，
+    页面开销与关联表的大小无关。
+    """
+
+    def __init__(self, url, attrs=None):
+        """
+        :param url: 关联model的联想接口
+        :param attrs: 标签属性
+        """
+        super().__init__(attrs=attrs)
+        self.url = url
+
+    def build_attrs(self, base_attrs, extra_attrs=None):
+        attrs = super().build_attrs(base_attrs, extra_attrs=extra_attrs)
+        attrs["data-autocomplete-url"] = self.url
+        return attrs
+
+    def optgroups(self, name, value, attrs=None):
+        """只生成空选项和已选中的选项"""
+        groups = []
+        field = self.choices.field
+        index = 0
+        selected = [item for item in value if item]
+
+        if field.empty_label is not None and not self.allow_multiple_selected:
+            groups.append((None, [self.create_option(name, "", field.empty_label, not selected, index, attrs=attrs)],
+                           index))
+            index += 1
+
+        if not selected:
+            return groups
+
+        # 提交的数据有误时，不渲染无法识别的值
+        key = field.to_field_name or "pk"
+        try:
+            selected_list = list(self.choices.queryset.filter(**{"%s__in" % key: selected}))
+        except (ValueError, TypeError, ValidationError):
+            selected_list = []
+
+        for obj in selected_list:
+            option_value, option_label = self.choices.choice(obj)
+            groups.append((None, [self.create_option(name, option_value, option_label, True, index, attrs=attrs)],
+                           index))
+            index += 1
+        return groups
+
+
+class AutocompleteSelect(AutocompleteMixin, forms.Select):
+    """外键"""
+
+
+class AutocompleteSelectMultiple(AutocompleteMixin, forms.SelectMultiple):
+    """多对多"""
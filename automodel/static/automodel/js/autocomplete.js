@@ -0,0 +1,50 @@
+// 外键/多对多字段的输入联想：输入关键字后向关联model的联想接口分页获取选项
+$(function () {
+    $("select[data-autocomplete-url]").each(function () {
+        var $select = $(this);
+        var url = $select.data("autocomplete-url");
+        var $input = $('<input type="text" class="form-control" placeholder="请输入搜索内容">');
+        var $more = $('<a href="javascript:void(0)" style="display: none">加载更多</a>');
+        var term = "";
+        // 上一页最后一条，用于取下一页
+        var next = null;
+        var timer = null;
+
+        $select.before($input).after($more);
+
+        function load(append) {
+            var params = {term: term};
+            if (append && next) {
+                params.after_value = next.after_value;
+                params.after_pk = next.after_pk;
+            }
+            $.getJSON(url, params, function (data) {
+                if (!append) {
+                    // 保留空选项和已选中的选项
+                    $select.find("option").not(":selected").not('[value=""]').remove();
+                }
+                $.each(data.results, function (index, item) {
+                    if (!$select.find('option[value="' + item.id + '"]').length) {
+                        $select.append($("<option>").val(item.id).text(item.text));
+                    }
+                });
+                next = data.next;
+                $more.toggle(data.more);
+            });
+        }
+
+        $input.on("input", function () {
+            clearTimeout(timer);
+            timer = setTimeout(function () {
+                term = $.trim($input.val());
+                load(false);
+            }, 300);
+        });
+
+        $more.on("click", function () {
+            load(true);
+        });
+
+        load(false);
+    });
+});
@@ -1,3 +1,568 @@
-from django.test import TestCase
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from types import MethodType
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import OperationalError
+from django.db.models import Count, Max, ProtectedError, Q, Sum
+from django.db.models.signals import pre_delete
+from django.test import RequestFactory, SimpleTestCase, TestCase
+
+from app01.automodel import RoleConfig
+from automodel.services import automodel
+from app01.models import Role, Department, User, Host
+from automodel.checks import check_shared_cache
+from automodel.models import AuditLog
+from automodel.services.audit import AuditWriter, audit_writer
+from automodel.services.deletion import CascadeDeleter
+from automodel.services.singleflight import SingleFlight, CacheSingleFlight
+from automodel.services.widgets import AutocompleteSelect, AutocompleteSelectMultiple
+
+
+class Counter:
+    """记录计算函数被调用的次数"""
+
+    def __init__(self, result="result", release=None, error=None):
+        """
+        :param release: 计算开始后等待该Event再返回
+        :param error: 计算时抛出的异常
+        """
+        self.lock = threading.Lock()
+        self.count = 0
+        self.result = result
+        self.release = release
+        self.error = error
+
+    def __call__(self):
+        with self.lock:
+            self.count += 1
+        if self.release is not None:
+            self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def run_in_threads(func, number):
+    """并发执行func，返回每个线程的结果或异常"""
+    results = [None] * number
+
+    def target(index):
+        try:
+            results[index] = func()
+        except Exception as error:
+            results[index] = error
+
+    threads = [threading.Thread(target=target, args=(index, )) for index in range(number)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+
+class SingleFlightTests(SimpleTestCase):
+
+    def setUp(self):
+        self.flight = SingleFlight()
+
+    def test_one_computation_per_key(self):
+        release = threading.Event()
+        func = Counter(release=release)
+        threads, results = run_in_threads(lambda: self.flight.do("key", func, timeout=5), 10)
+        time.sleep(0.2)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(func.count, 1)
+        self.assertEqual(results, ["result"] * 10)
+        self.assertEqual(self.flight._calls, {})
+
+    def test_different_keys_are_not_coalesced(self):
+        func = Counter()
+        self.flight.do("a", func)
+        self.flight.do("b", func)
+        self.assertEqual(func.count, 2)
+
+    def test_waiter_falls_back_on_timeout(self):
+        release = threading.Event()
+        leader = Counter("leader", release=release)
+        threads, results = run_in_threads(lambda: self.flight.do("key", leader, timeout=5), 1)
+        time.sleep(0.1)
+
+        waiter = Counter("waiter")
+        start = time.monotonic()
+        self.assertEqual(self.flight.do("key", waiter, timeout=0.1), "waiter")
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual(waiter.count, 1)
+
+        release.set()
+        threads[0].join()
+        self.assertEqual(results, ["leader"])
+
+    def test_waiter_recomputes_after_leader_raises(self):
+        release = threading.Event()
+        leader = Counter(release=release, error=ValueError("leader failed"))
+        threads, results = run_in_threads(lambda: self.flight.do("key", leader, timeout=5), 1)
+        time.sleep(0.1)
+
+        waiter = Counter("waiter")
+        waiter_threads, waiter_results = run_in_threads(lambda: self.flight.do("key", waiter, timeout=5), 3)
+        time.sleep(0.1)
+        release.set()
+        for thread in threads + waiter_threads:
+            thread.join()
+
+        self.assertIsInstance(results[0], ValueError)
+        self.assertEqual(waiter_results, ["waiter"] * 3)
+        self.assertEqual(waiter.count, 3)
+        # 出错后不会残留，之后的请求重新计算
+        self.assertEqual(self.flight.do("key", Counter("again")), "again")
+
+
+class CacheSingleFlightTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.flight = CacheSingleFlight(poll_interval=0.01)
+        self.result_key = "%s:result:key" % CacheSingleFlight.key_prefix
+        self.lock_key = "%s:lock:key" % CacheSingleFlight.key_prefix
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_result_is_shared_through_cache(self):
+        func = Counter()
+        self.assertEqual(self.flight.do("key", func), "result")
+        self.assertEqual(CacheSingleFlight().do("key", func), "result")
+        self.assertEqual(func.count, 1)
+        self.assertIsNone(cache.get(self.lock_key))
+
+    def test_waits_for_lock_holder_in_other_process(self):
+        # 模拟其他进程持有锁，稍后写入结果
+        cache.add(self.lock_key, 1, 5)
+
+        def other_process():
+            time.sleep(0.1)
+            cache.set(self.result_key, "other", 5)
+            cache.delete(self.lock_key)
+
+        thread = threading.Thread(target=other_process)
+        thread.start()
+        func = Counter()
+        self.assertEqual(self.flight.do("key", func, timeout=5), "other")
+        thread.join()
+        self.assertEqual(func.count, 0)
+
+    def test_recomputes_when_lock_holder_fails(self):
+        cache.add(self.lock_key, 1, 5)
+        threading.Timer(0.1, cache.delete, args=(self.lock_key, )).start()
+        func = Counter("own")
+        self.assertEqual(self.flight.do("key", func, timeout=5), "own")
+        self.assertEqual(func.count, 1)
+
+    def test_recomputes_on_timeout(self):
+        cache.add(self.lock_key, 1, 5)
+        func = Counter("own")
+        start = time.monotonic()
+        self.assertEqual(self.flight.do("key", func, timeout=0.2), "own")
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual(func.count, 1)
+
+
+class CascadeDeleterTests(TestCase):
+
+    def setUp(self):
+        self.role = Role.objects.create(title="role")
+        self.dep = Department.objects.create(caption="dep")
+        self.other_dep = Department.objects.create(caption="other")
+        self.user = User.objects.create(username="user", password="password", email="a@b.c", dep=self.other_dep)
+        self.user.role.add(self.role)
+        self.host = Host.objects.create(ip="127.0.0.1", dep=self.dep)
+
+    def test_raw_delete_cascades_and_sets_null(self):
+        # 删除角色时级联删除用户角色关系
+        deleter = CascadeDeleter(Role.objects.filter(pk=self.role.pk))
+        self.assertTrue(deleter.fast)
+        deleter.delete()
+        self.assertFalse(Role.objects.exists())
+        self.assertFalse(User.role.through.objects.exists())
+        self.assertTrue(User.objects.filter(pk=self.user.pk).exists())
+
+        # 删除部门时主机的部门置空
+        deleter = CascadeDeleter(Department.objects.filter(pk=self.dep.pk))
+        self.assertTrue(deleter.fast)
+        self.assertEqual(deleter.preview(), [("department", "删除", 1), ("host", "置空", 1)])
+        deleter.delete()
+        self.host.refresh_from_db()
+        self.assertIsNone(self.host.dep_id)
+        self.assertFalse(Department.objects.filter(pk=self.dep.pk).exists())
+
+    def test_protected(self):
+        queryset = Department.objects.filter(pk=self.other_dep.pk)
+        deleter = CascadeDeleter(queryset)
+        self.assertTrue(deleter.protected)
+        self.assertIn(("user", "禁止删除", 1), deleter.preview())
+        with self.assertRaises(ProtectedError):
+            deleter.delete()
+        self.assertTrue(queryset.exists())
+
+        self.user.delete()
+        self.assertFalse(CascadeDeleter(queryset).protected)
+
+    def test_invalid_on_delete_is_protected(self):
+        field = Host._meta.get_field("dep")
+        on_delete = field.remote_field.on_delete
+        field.remote_field.on_delete = False
+        try:
+            deleter = CascadeDeleter(Department.objects.filter(pk=self.dep.pk))
+            self.assertTrue(deleter.protected)
+            with self.assertRaises(ProtectedError):
+                deleter.delete()
+        finally:
+            field.remote_field.on_delete = on_delete
+        self.assertTrue(Host.objects.filter(dep=self.dep).exists())
+
+    def test_receiver_falls_back_to_queryset_delete(self):
+        deleted = []
+
+        def receiver(sender, instance, **kwargs):
+            deleted.append(instance.pk)
+
+        pre_delete.connect(receiver, sender=User)
+        try:
+            deleter = CascadeDeleter(User.objects.filter(pk=self.user.pk))
+            self.assertFalse(deleter.fast)
+            deleter.delete()
+        finally:
+            pre_delete.disconnect(receiver, sender=User)
+        self.assertEqual(deleted, [self.user.pk])
+        self.assertFalse(User.objects.exists())
+        self.assertFalse(User.role.through.objects.exists())
+
+
+class ConditionalGetTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        RoleConfig.conditional_get = True
+        self.url = "/automodel/app01/role/"
+
+    def tearDown(self):
+        RoleConfig.conditional_get = False
+        cache.clear()
+
+    def test_etag_only(self):
+        self.client.get(self.url)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("Last-Modified", response)
+
+        etag = response["ETag"]
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        # 同一秒内的修改也会改变ETag
+        Role.objects.create(title="role")
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_warns_without_shared_cache(self):
+        with self.settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}):
+            self.assertEqual([error.id for error in check_shared_cache(None)], ["automodel.W001"])
+        with self.settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.db.DatabaseCache",
+                                               "LOCATION": "automodel_cache"}}):
+            self.assertEqual(check_shared_cache(None), [])
+
+
+def joined(self, data_obj=None, is_header=False, config=None):
+    """返回时间和数字的自定义列，需经过本地化"""
+    if is_header:
+        return "时间"
+    return datetime(2026, 10, 19, 10, 18, tzinfo=timezone.utc)
+
+
+def score(self, data_obj=None, is_header=False, config=None):
+    if is_header:
+        return "分数"
+    return 1234.5
+
+
+class ListRenderTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.config = automodel.site._registry[User]
+        self.config.list_display = ["id", "username", "dep", "email",
+                                    MethodType(joined, self.config), MethodType(score, self.config)]
+        dep = Department.objects.create(caption="<研发部>")
+        for index in range(2):
+            User.objects.create(username="user%s&" % index, password="password", email="a@b.c", dep=dep)
+        self.url = self.config.get_list_url()
+
+    def tearDown(self):
+        for name in ("list_display", "fast_render", "stream_render"):
+            self.config.__dict__.pop(name, None)
+        cache.clear()
+
+    def get_tbody(self, **options):
+        for name, value in options.items():
+            setattr(self.config, name, value)
+        response = self.client.get(self.url)
+        if response.streaming:
+            content = b"".join(response.streaming_content)
+        else:
+            content = response.content
+        tbody = re.search(r"<tbody>(.*)</tbody>", content.decode("utf-8"), re.S).group(1)
+        return re.sub(r">\s+<", "><", tbody).strip()
+
+    def test_fast_and_stream_match_template(self):
+        template = self.get_tbody()
+        self.assertIn("Oct. 19, 2026, 10:18 a.m.", template)
+        self.assertIn("&lt;研发部&gt;", template)
+        self.assertIn("user0&amp;", template)
+        self.assertEqual(self.get_tbody(fast_render=True), template)
+        self.assertEqual(self.get_tbody(fast_render=False, stream_render=True), template)
+
+
+class AutocompleteTests(TestCase):
+
+    def setUp(self):
+        self.role_config = automodel.site._registry[Role]
+        self.dep_config = automodel.site._registry[Department]
+        self.user_config = automodel.site._registry[User]
+        self.role_config.autocomplete_per_page = 2
+        # 相同的值按主键继续翻页
+        titles = ["a1", "a2", "a2", "a2", "a3", "b1"]
+        self.roles = [Role.objects.create(title=title) for title in titles]
+
+    def tearDown(self):
+        for config in (self.role_config, self.dep_config, self.user_config):
+            config.__dict__.pop("autocomplete_per_page", None)
+            config.__dict__.pop("search_fields", None)
+
+    def get(self, config, **params):
+        response = self.client.get(config.get_autocomplete_url(), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_keyset_paging(self):
+        ids = []
+        params = {"term": "a"}
+        pages = 0
+        while True:
+            data = self.get(self.role_config, **params)
+            pages += 1
+            ids.extend(item["id"] for item in data["results"])
+            if not data["more"]:
+                self.assertIsNone(data["next"])
+                break
+            params = dict(params, **data["next"])
+        self.assertEqual(pages, 3)
+        self.assertEqual(ids, [role.pk for role in self.roles if role.title.startswith("a")])
+
+    def test_results(self):
+        data = self.get(self.role_config, term="b")
+        self.assertEqual(data, {"results": [{"id": self.roles[-1].pk, "text": "b1"}], "more": False, "next": None})
+        self.assertEqual(self.get(self.role_config, term="c")["results"], [])
+
+    def test_lookup_path_is_not_used(self):
+        self.user_config.search_fields = ["dep__caption", "username"]
+        self.assertEqual(self.user_config.get_autocomplete_search_field(), "username")
+        self.user_config.search_fields = ["dep__caption"]
+        self.assertIsNone(self.user_config.get_autocomplete_search_field())
+        self.assertEqual(self.get(self.user_config, term="a"), {"results": [], "more": False, "next": None})
+
+    def test_widgets(self):
+        widgets = self.user_config.get_autocomplete_widgets()
+        self.assertIsInstance(widgets["dep"], AutocompleteSelect)
+        self.assertIsInstance(widgets["role"], AutocompleteSelectMultiple)
+
+        # 关联model不提供联想时使用默认插件
+        self.dep_config.search_fields = []
+        self.assertNotIn("dep", self.user_config.get_autocomplete_widgets())
+        form = self.user_config.get_model_form_class()()
+        self.assertNotIsInstance(form.fields["dep"].widget, AutocompleteSelect)
+
+
+class AuditWriterTests(SimpleTestCase):
+    """用mock代替bulk_create，记录每次写入的一批"""
+
+    def setUp(self):
+        self.batches = []
+        patcher = mock.patch.object(AuditLog.objects, "bulk_create",
+                                    side_effect=lambda batch, **kwargs: self.batches.append(list(batch)))
+        self.bulk_create = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_batching(self):
+        writer = AuditWriter(batch_size=3, flush_interval=0.05)
+        for index in range(7):
+            writer.queue.put(index)
+        writer.start()
+        writer.close()
+        self.assertEqual(self.batches, [[0, 1, 2], [3, 4, 5], [6]])
+
+    def test_close_flushes_queue(self):
+        writer = AuditWriter(flush_interval=10)
+        for index in range(3):
+            writer.put(index)
+        writer.close()
+        self.assertEqual(sum(self.batches, []), [0, 1, 2])
+        self.assertIsNone(writer._thread)
+
+    def test_blocks_then_writes_inline_when_full(self):
+        writer = AuditWriter(max_size=1, put_timeout=0.2)
+        # 不启动后台线程，队列不会被取走
+        writer.start = lambda: None
+        writer.put("queued")
+        start = time.monotonic()
+        with self.assertLogs("automodel.services.audit", "WARNING"):
+            writer.put("inline")
+        self.assertGreaterEqual(time.monotonic() - start, 0.2)
+        self.assertEqual(self.batches, [["inline"]])
+        self.assertEqual(writer.queue.get_nowait(), "queued")
+
+    def test_retries_operational_error(self):
+        self.bulk_create.side_effect = [OperationalError("database is locked"), None]
+        writer = AuditWriter(retry_delay=0.01)
+        with self.assertLogs("automodel.services.audit", "WARNING"):
+            writer.write(["entry"])
+        self.assertEqual(self.bulk_create.call_count, 2)
+
+    def test_drops_after_retries(self):
+        self.bulk_create.side_effect = OperationalError("database is locked")
+        writer = AuditWriter(retries=2, retry_delay=0.01)
+        with self.assertLogs("automodel.services.audit", "ERROR"):
+            writer.write(["entry"])
+        self.assertEqual(self.bulk_create.call_count, 3)
+
+
+class ActionAuditTests(TestCase):
+
+    def setUp(self):
+        self.config = automodel.site._registry[Department]
+        self.config.audit = True
+        self.dep = Department.objects.create(caption="dep")
+        patcher = mock.patch.object(audit_writer, "put")
+        self.put = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.config.__dict__.pop("audit", None)
+
+    def post(self, pk_list):
+        return self.client.post(self.config.get_list_url(), {"action": "multi_delete", "pk": pk_list})
+
+    def test_logs_after_delete(self):
+        self.assertEqual(self.post([self.dep.pk]).content.decode("utf-8"), "删除成功")
+        self.assertFalse(Department.objects.exists())
+        entry = self.put.call_args[0][0]
+        self.assertEqual((entry.action, entry.changes), ("multi_delete", '{"pk": ["%s"]}' % self.dep.pk))
+
+    def test_refused_or_empty_delete_is_not_logged(self):
+        User.objects.create(username="user", password="password", email="a@b.c", dep=self.dep)
+        self.assertEqual(self.post([self.dep.pk]).content.decode("utf-8"), "存在禁止删除的关联数据，无法删除！")
+        self.post([])
+        self.put.assert_not_called()
+
+
+class AggregateTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.config = automodel.site._registry[User]
+        self.dep = Department.objects.create(caption="研发部")
+        for index in range(2):
+            User.objects.create(username="user%s" % index, password="password", email="a@b.c", dep=self.dep)
+        self.url = self.config.get_list_url()
+
+    def tearDown(self):
+        self.config.__dict__.pop("list_aggregates", None)
+        self.config.__dict__.pop("coalesce_requests", None)
+        self.config.__dict__.pop("coalesce_across_processes", None)
+        cache.clear()
+
+    def get_tfoot(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        match = re.search(r"<tfoot>(.*)</tfoot>", response.content.decode("utf-8"), re.S)
+        return re.sub(r"\s+", " ", match.group(1)) if match else None
+
+    def test_footer(self):
+        self.assertIsNone(self.get_tfoot())
+        self.config.list_aggregates = {"id": Count("id"), "email": Max("email"), "部门数": Count("dep", distinct=True)}
+        tfoot = self.get_tfoot()
+        self.assertIn("<td>汇总</td>", tfoot)
+        self.assertIn("<td>Count: 2</td>", tfoot)
+        self.assertIn("<td>Max: a@b.c</td>", tfoot)
+        self.assertIn("部门数: 1", tfoot)
+
+    def test_combined_expression_uses_column_name(self):
+        self.config.list_aggregates = {"id": Sum("id") * 2}
+        total = sum(User.objects.values_list("id", flat=True)) * 2
+        self.assertIn("<td>id: %s</td>" % total, self.get_tfoot())
+
+    def test_cache_key(self):
+        self.config.list_aggregates = {"id": Count("id")}
+        data_list = User.objects.all()
+        self.assertEqual(self.config.get_aggregates(data_list), {"id": 2})
+        # 查询条件和聚合定义都属于key
+        self.assertEqual(self.config.get_aggregates(data_list.filter(username="user0")), {"id": 1})
+        self.config.list_aggregates = {"id": Max("id")}
+        self.assertEqual(self.config.get_aggregates(data_list), {"id": User.objects.order_by("-id")[0].id})
+
+    def test_invalidated_by_own_and_related_writes(self):
+        self.config.list_aggregates = {"研发部人数": Count("id", filter=Q(dep__caption="研发部"))}
+        self.assertIn("研发部人数: 2", self.get_tfoot())
+        User.objects.create(username="user2", password="password", email="a@b.c", dep=self.dep)
+        self.assertIn("研发部人数: 3", self.get_tfoot())
+        self.dep.caption = "测试部"
+        self.dep.save()
+        self.assertIn("研发部人数: 0", self.get_tfoot())
+
+    def test_version_options_warn_without_shared_cache(self):
+        self.config.list_aggregates = {"id": Count("id")}
+        self.config.coalesce_requests = True
+        self.config.coalesce_across_processes = True
+        with self.settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}):
+            errors = check_shared_cache(None)
+        self.assertEqual([error.id for error in errors], ["automodel.W001"])
+        self.assertIn("list_aggregates、coalesce_across_processes", errors[0].msg)
+
+
+class WarmTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.config = automodel.site._registry[User]
+        dep = Department.objects.create(caption="dep")
+        for index in range(5):
+            User.objects.create(username="user%s" % index, password="password", email="a@b.c", dep=dep)
+
+    def tearDown(self):
+        for name in ("list_cache", "list_cache_pages", "list_aggregates"):
+            self.config.__dict__.pop(name, None)
+        cache.clear()
+
+    def test_pages_capped_at_cached_pages(self):
+        self.config.list_aggregates = {"id": Count("id")}
+        self.assertEqual(self.config.get_warm_pages(5), 1)
+        self.config.list_cache = True
+        self.config.list_cache_pages = 2
+        self.assertEqual(self.config.get_warm_pages(), 2)
+        self.assertEqual(self.config.get_warm_pages(1), 1)
+        self.assertEqual(self.config.warm(5), 2)
+
+    def test_warm_fills_cache(self):
+        self.config.list_cache = True
+        self.config.list_cache_pages = 2
+        self.config.warm()
+        self.config.request = None
+        data_list = User.objects.all()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.config.get_count(data_list), 5)
+            for page in (1, 2):
+                self.config.request = RequestFactory().get("/", {"page": page})
+                pager = self.config.get_pager(5)
+                self.assertEqual(len(self.config.get_page_list(data_list, pager)), 2)
+        self.config.request = None